@@ -0,0 +1,105 @@
+"""In-process change feed for server-sent events"""
+
+import asyncio
+import threading
+import uuid
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+# How many events a reconnecting client can catch up on before it must refetch
+EVENT_BUFFER_SIZE = 256
+KEEPALIVE_SECONDS = 15
+
+
+class Event(NamedTuple):
+    epoch: str
+    seq: int
+    event: str
+    data: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.epoch}-{self.seq}"
+
+    def encode(self) -> str:
+        lines = [f"id: {self.id}", f"event: {self.event}"]
+        lines += [f"data: {line}" for line in self.data.splitlines() or [""]]
+        return "\n".join(lines) + "\n\n"
+
+
+class EventBus:
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.buffer = deque(maxlen=buffer_size)
+        # Sequence numbers restart with the process, the epoch tells them apart
+        self.epoch = uuid.uuid4().hex[:8]
+        self.last_seq = 0
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    @property
+    def last_event_id(self) -> str:
+        with self.lock:
+            return f"{self.epoch}-{self.last_seq}"
+
+    def publish(self, event: str, data: str) -> Event:
+        with self.lock:
+            self.last_seq += 1
+            new_event = Event(self.epoch, self.last_seq, event, data)
+            self.buffer.append(new_event)
+            subscribers = list(self.subscribers.items())
+
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, new_event)
+        return new_event
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        with self.lock:
+            self.subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def replay(self, last_event_id: Optional[str]) -> List[Event]:
+        """Events missed since last_event_id, or a reset if they are gone"""
+        if last_event_id is None:
+            return []
+        epoch, _, seq = last_event_id.rpartition("-")
+        with self.lock:
+            reset = [Event(self.epoch, self.last_seq, "reset", "")]
+            # Ids from another process describe a different history
+            if epoch != self.epoch or not seq.isdigit():
+                return reset
+            last_seq = int(seq)
+            oldest_seq = self.buffer[0].seq if self.buffer else self.last_seq + 1
+            # The client fell behind the ring buffer
+            if last_seq < oldest_seq - 1 or last_seq > self.last_seq:
+                return reset
+            return [event for event in self.buffer if event.seq > last_seq]
+
+
+bus = EventBus()
+
+
+async def event_stream(request, last_event_id: Optional[str]):
+    # Subscribe before replaying so nothing published in between is lost
+    queue = bus.subscribe()
+    try:
+        sent_seq = 0
+        for event in bus.replay(last_event_id):
+            sent_seq = event.seq
+            yield event.encode()
+
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event.seq > sent_seq:
+                sent_seq = event.seq
+                yield event.encode()
+    finally:
+        bus.unsubscribe(queue)
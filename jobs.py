@@ -0,0 +1,99 @@
+"""Background import jobs"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from sqlmodel import Field, SQLModel, Session, select
+from util import logger
+from events import bus
+from xml_to_json import fetch_steam_games, import_to_db
+
+# A single worker keeps imports serialized so they never compete for the write lock
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+
+
+class ImportJob(SQLModel, table=True):
+    __tablename__ = "import_jobs"
+
+    """ Import Job Model """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    steamid: str
+    status: str = "queued"  # queued, running, done, failed
+    total: int = 0
+    processed: int = 0
+    imported: int = 0
+    error: str = ""
+
+
+def enqueue_import(engine, steamid: str) -> ImportJob:
+    with Session(engine) as session:
+        job = ImportJob(steamid=steamid)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+    logger.info(f"Queued import job: {job}")
+    executor.submit(run_import, engine, job.id)
+    return job
+
+
+def run_import(engine, job_id: int):
+    # Anything raised here would vanish into the unread future, so catch it all
+    try:
+        update_job(engine, job_id, status="running")
+        games = fetch_steam_games(get_job(engine, job_id).steamid)
+        update_job(engine, job_id, total=len(games))
+
+        def on_batch(session: Session, processed: int, imported: int):
+            # Progress is committed together with the batch it describes
+            job = session.get(ImportJob, job_id)
+            job.processed = processed
+            job.imported = imported
+            session.add(job)
+
+        imported = import_to_db(games, engine=engine, on_batch=on_batch)
+        update_job(engine, job_id, status="done")
+    except Exception as exc:
+        logger.exception(f"Import job {job_id} failed: {exc}")
+        try:
+            update_job(engine, job_id, status="failed", error=str(exc))
+            imported = get_job(engine, job_id).imported
+        except Exception:
+            logger.exception(f"Could not mark import job {job_id} as failed")
+            return
+        # Batches committed before the failure are already in the database
+        if imported:
+            bus.publish("reset", "")
+        return
+
+    logger.info(f"Import job {job_id} finished")
+    # Imported rows are not published one by one, live clients refetch instead
+    if imported:
+        bus.publish("reset", "")
+
+
+def get_job(engine, job_id: int) -> Optional[ImportJob]:
+    with Session(engine) as session:
+        return session.get(ImportJob, job_id)
+
+
+def update_job(engine, job_id: int, **fields):
+    with Session(engine) as session:
+        job = session.get(ImportJob, job_id)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        session.add(job)
+        session.commit()
+
+
+def fail_interrupted_jobs(engine):
+    """Jobs left queued or running by a previous process will never finish"""
+    with Session(engine) as session:
+        jobs = session.exec(
+            select(ImportJob).where(ImportJob.status.in_(["queued", "running"]))
+        ).all()
+        for job in jobs:
+            logger.info(f"Marking interrupted import job as failed: {job}")
+            job.status = "failed"
+            job.error = "Interrupted by server restart"
+            session.add(job)
+        session.commit()
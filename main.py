@@ -2,7 +2,7 @@ from contextlib import contextmanager
 from typing import Annotated, Union, List, Dict, Optional
 from fastapi import FastAPI, Request, Header, Form, Depends, Query, Response, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
@@ -19,6 +19,8 @@ from game import (
     PlatformModel,
     initialize_lookup_tables,
 )
+from jobs import ImportJob, enqueue_import, get_job, fail_interrupted_jobs
+from events import bus, event_stream
 
 DB_FILE = "sqlite:///games.db"
 engine = create_engine(DB_FILE, echo=False)
@@ -28,6 +30,7 @@ engine = create_engine(DB_FILE, echo=False)
 def init_db():
     SQLModel.metadata.create_all(engine)
     initialize_lookup_tables(engine)
+    fail_interrupted_jobs(engine)
 
 
 app = FastAPI(debug=True)
@@ -62,6 +65,8 @@ async def games_list(
     db: Session = Depends(get_db),
 ):
 
+    # Taken before the query so the feed replays anything written after it
+    last_event_id = bus.last_event_id
     statement = select(Game)
     # basic filtering
     if title:
@@ -74,36 +79,7 @@ async def games_list(
     result = db.exec(statement)
     games = result.all()
 
-    games_data = []
-    for game in games:
-        platforms = db.exec(
-            select(PlatformModel)
-            .join(GamePlatformLink)
-            .where(GamePlatformLink.game_id == game.id)
-        ).all()
-        genres = db.exec(
-            select(GenreModel)
-            .join(GameGenreLink)
-            .where(GameGenreLink.game_id == game.id)
-        ).all()
-
-        game_dict = {
-            "id": game.id,
-            "title": game.title,
-            "start_date": game.start_date,
-            "end_date": game.end_date,
-            "completed": game.completed,
-            "steam_store_url": game.steam_store_url,
-            "gog_store_url": game.gog_store_url,
-            "image_url": game.image_url,
-            "comments": game.comments,
-            "tags": game.tags,
-            "platforms": [p.name for p in platforms],
-            "genres": [g.name for g in genres],
-            "developer": game.developer,
-            "rating": game.rating,
-        }
-        games_data.append(game_dict)
+    games_data = [game_to_dict(db, game) for game in games]
 
     # Return template response or JSON based on request type
     context = {
@@ -114,6 +90,7 @@ async def games_list(
         "title_filter": title,
         "completed_filter": completed,
         "rating_filter": rating,
+        "last_event_id": last_event_id,
     }
 
     if hx_request:
@@ -121,6 +98,20 @@ async def games_list(
     return JSONResponse(content=jsonable_encoder(games_data))
 
 
+@app.get("/games/events")
+async def games_events(
+    request: Request,
+    last_event_id: Annotated[Optional[str], Header()] = None,
+    since: Annotated[Optional[str], Query()] = None,
+):
+    # Browsers only send Last-Event-ID on reconnect, first connects pass since
+    return StreamingResponse(
+        event_stream(request, last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @app.post("/games", response_class=HTMLResponse)
 async def create_game(
     request: Request,
@@ -137,6 +128,7 @@ async def create_game(
     genres: Annotated[Union[List[str], None], Form()] = None,
     developer: Annotated[str, Form()] = "",
     rating: Annotated[int, Form()] = 0,
+    hx_request: Annotated[Union[str, None], Header()] = None,
     db: Session = Depends(get_db),
 ):
     new_game = Game(
@@ -177,7 +169,11 @@ async def create_game(
 
     db.commit()
     logger.info(f"New game created: {new_game}")
+    row = publish_game(db, "created", new_game)
 
+    # HTMX clients only need the new row
+    if hx_request:
+        return HTMLResponse(row)
     # Redirect to games list
     return await games_list(request, hx_request="true", db=db)
 
@@ -229,6 +225,7 @@ async def update_game(
     genres: Annotated[Union[List[str], None], Form()] = None,
     developer: Annotated[str, Form()] = "",
     rating: Annotated[int, Form()] = 0,
+    hx_request: Annotated[Union[str, None], Header()] = None,
     db: Session = Depends(get_db),
 ):
     game = db.get(Game, game_id)
@@ -265,12 +262,20 @@ async def update_game(
             db.add(GameGenreLink(game_id=game.id, genre_id=genre.id))
 
     db.commit()
+    row = publish_game(db, "updated", game)
+    if hx_request:
+        return HTMLResponse(row)
     # Redirect to games list
     return await games_list(request, hx_request="true", db=db)
 
 
 @app.post("/games/{game_id}/delete", response_class=HTMLResponse)
-async def delete_game(request: Request, game_id: int, db: Session = Depends(get_db)):
+async def delete_game(
+    request: Request,
+    game_id: int,
+    hx_request: Annotated[Union[str, None], Header()] = None,
+    db: Session = Depends(get_db),
+):
     game = db.get(Game, game_id)
     if not game:
         return JSONResponse(status_code=404, content={"message": "Game not found"})
@@ -280,16 +285,67 @@ async def delete_game(request: Request, game_id: int, db: Session = Depends(get_
 
     db.delete(game)
     db.commit()
+    bus.publish("deleted", str(game_id))
+    # An empty body removes the row from the HTMX client
+    if hx_request:
+        return HTMLResponse("")
 
     # Redirect to games list
     return await games_list(request, hx_request="true", db=db)
 
 
+@app.post("/imports", response_class=HTMLResponse)
+async def create_import(
+    request: Request,
+    steamid: Annotated[str, Form()],
+    hx_request: Annotated[Union[str, None], Header()] = None,
+    db: Session = Depends(get_db),
+):
+    # The worker opens its own short sessions against the same database
+    job = enqueue_import(db.get_bind(), steamid)
+    return import_status(request, job, hx_request, status_code=202)
+
+
+@app.get("/imports/{job_id}", response_class=HTMLResponse)
+async def view_import(
+    request: Request,
+    job_id: int,
+    hx_request: Annotated[Union[str, None], Header()] = None,
+    db: Session = Depends(get_db),
+):
+    job = get_job(db.get_bind(), job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"message": "Import not found"})
+    return import_status(request, job, hx_request)
+
+
+def import_status(
+    request: Request, job: ImportJob, hx_request: Optional[str], status_code=200
+):
+    if hx_request:
+        return templates.TemplateResponse(
+            "import_job.html",
+            context={"request": request, "job": job},
+            status_code=status_code,
+        )
+    return JSONResponse(status_code=status_code, content=jsonable_encoder(job))
+
+
+def publish_game(db: Session, event: str, game: Game) -> str:
+    row = templates.get_template("game_row.html").render(game=game_to_dict(db, game))
+    bus.publish(event, row)
+    return row
+
+
 def get_game(db: Session, game_id: int) -> Dict:
     game = db.get(Game, game_id)
     if not game:
         return JSONResponse(status_code=404, content={"message": "Game not found"})
 
+    return game_to_dict(db, game, use_ids=True)  # Use IDs for form selection
+
+
+def game_to_dict(db: Session, game: Game, use_ids: bool = False) -> Dict:
     platforms = db.exec(
         select(PlatformModel)
         .join(GamePlatformLink)
@@ -299,7 +355,7 @@ def get_game(db: Session, game_id: int) -> Dict:
         select(GenreModel).join(GameGenreLink).where(GameGenreLink.game_id == game.id)
     ).all()
 
-    game_data = {
+    return {
         "id": game.id,
         "title": game.title,
         "start_date": game.start_date,
@@ -310,12 +366,11 @@ def get_game(db: Session, game_id: int) -> Dict:
         "image_url": game.image_url,
         "comments": game.comments,
         "tags": game.tags,
-        "platforms": [p.id for p in platforms],  # Use IDs for form selection
-        "genres": [g.id for g in genres],
+        "platforms": [p.id if use_ids else p.name for p in platforms],
+        "genres": [g.id if use_ids else g.name for g in genres],
         "developer": game.developer,
         "rating": game.rating,
     }
-    return game_data
 
 
 @app.exception_handler(Exception)
@@ -1,3 +1,5 @@
+import asyncio
+from functools import partial
 import pytest
 import os
 from fastapi import FastAPI
@@ -14,6 +16,12 @@ from game import (
     initialize_lookup_tables,
 )
 from util import logger
+import jobs
+import xml_to_json
+import events
+from events import EventBus, bus
+from starlette.requests import Request
+from sqlalchemy.exc import OperationalError
 
 DB_FILE = "testdb.db"
 TEST_DB_PATH = "sqlite:///" + DB_FILE
@@ -134,7 +142,342 @@ def test_game_edit(client):
     assert "Test Game - edit" in response.text
 
 
+def test_games_list_filter_attributes(client):
+    """Test that the list carries its filters and rows carry matching data."""
+    response = client.get(
+        "/games",
+        params={"title": "Game", "completed": True, "rating": 4},
+        headers={"HX-Request": "true"},
+    )
+    assert response.status_code == 200
+    assert '<span id="games-count">' in response.text
+    assert 'data-title-filter="Game"' in response.text
+    assert 'data-completed-filter="true"' in response.text
+    assert 'data-rating-filter="4"' in response.text
+    assert 'data-title="Game1"' in response.text
+    assert 'data-rating="5"' in response.text
+
+
+def test_games_hx_writes_return_row(client):
+    """Test that HTMX writes return only the affected row."""
+    data = {
+        "title": "Row Game",
+        "start_date": "2023-01-01",
+        "end_date": "2023-12-31",
+        "rating": 2,
+    }
+    headers = {"HX-Request": "true"}
+    response = client.post("/games", data=data, headers=headers)
+    assert response.status_code == 200
+    assert response.text.lstrip().startswith("<li id=")
+    assert "<h3>" not in response.text
+    game_id = client.get("/games", params={"title": "Row Game"}).json()[0]["id"]
+
+    response = client.post(
+        f"/games/{game_id}", data={**data, "title": "Row Game - edit"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert f'<li id="game-{game_id}"' in response.text
+    assert "Row Game - edit" in response.text
+
+    response = client.post(f"/games/{game_id}/delete", headers=headers)
+    assert response.status_code == 200
+    assert response.text == ""
+
+
 def test_game_delete(client):
     """Test deleting a specific game (DELETE /games/{id}/delete)."""
     response = client.post("/games/1/delete")
     assert response.status_code == 200
+
+
+def wait_for_imports():
+    """Block until the single import worker has drained its queue."""
+    jobs.executor.submit(lambda: None).result()
+
+
+def test_import_create(client, monkeypatch):
+    """Test queueing a steam import (POST /imports)."""
+    steam_games = [
+        {"name": f"Imported {i}", "storeLink": "http://example.com/steam", "logo": ""}
+        for i in range(5)
+    ]
+    monkeypatch.setattr(jobs, "fetch_steam_games", lambda steamid: steam_games)
+    monkeypatch.setattr(xml_to_json, "BATCH_PAUSE", 0)
+
+    response = client.post("/imports", data={"steamid": "tester"})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    wait_for_imports()
+
+    response = client.get(f"/imports/{job_id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "done"
+    assert data["total"] == 5
+    assert data["processed"] == 5
+    assert data["imported"] == 5
+    assert bus.buffer[-1].event == "reset"
+
+    response = client.get("/games", params={"title": "Imported"})
+    assert len(response.json()) == 5
+
+
+def test_import_failed(client, monkeypatch):
+    """Test that a failing steam fetch marks the import as failed."""
+
+    def fetch_steam_games(steamid):
+        raise ValueError("no such profile")
+
+    monkeypatch.setattr(jobs, "fetch_steam_games", fetch_steam_games)
+
+    response = client.post("/imports", data={"steamid": "missing"})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    wait_for_imports()
+
+    response = client.get(f"/imports/{job_id}", headers={"HX-Request": "true"})
+    assert response.status_code == 200
+    assert "text/html" in response.headers["Content-Type"]
+    assert "failed" in response.text
+    assert "no such profile" in response.text
+
+
+def test_fetch_steam_games_private(monkeypatch):
+    """Test that a profile without a games list raises a readable error."""
+
+    class PrivateProfile:
+        text = "<gamesList><steamID>hidden</steamID></gamesList>"
+
+        def raise_for_status(self):
+            pass
+
+    urls = []
+
+    def get(url, timeout):
+        urls.append(url)
+        return PrivateProfile()
+
+    monkeypatch.setattr(xml_to_json.requests, "get", get)
+    with pytest.raises(ValueError, match="private or has no games"):
+        xml_to_json.fetch_steam_games("someone/../else")
+    assert "/id/someone%2F..%2Felse/games/" in urls[0]
+
+
+def test_import_steam_timeout(client, monkeypatch):
+    """Test that a stalled steam request fails the import instead of hanging."""
+    timeouts = []
+
+    def get(url, timeout):
+        timeouts.append(timeout)
+        raise xml_to_json.requests.Timeout("steam stalled")
+
+    monkeypatch.setattr(xml_to_json.requests, "get", get)
+
+    response = client.post("/imports", data={"steamid": "slow"})
+    job_id = response.json()["id"]
+    wait_for_imports()
+
+    data = client.get(f"/imports/{job_id}").json()
+    assert data["status"] == "failed"
+    assert "steam stalled" in data["error"]
+    assert timeouts == [xml_to_json.STEAM_TIMEOUT]
+
+
+def test_import_status_update_fails(client, monkeypatch):
+    """Test that an error while finishing the job still marks it failed."""
+    steam_games = [{"name": "Locked", "storeLink": "", "logo": ""}]
+    monkeypatch.setattr(jobs, "fetch_steam_games", lambda steamid: steam_games)
+    monkeypatch.setattr(xml_to_json, "BATCH_PAUSE", 0)
+    update_job = jobs.update_job
+
+    def locked_update_job(engine, job_id, **fields):
+        if fields.get("status") == "done":
+            raise OperationalError("UPDATE", {}, Exception("database is locked"))
+        update_job(engine, job_id, **fields)
+
+    monkeypatch.setattr(jobs, "update_job", locked_update_job)
+
+    response = client.post("/imports", data={"steamid": "locked"})
+    job_id = response.json()["id"]
+    wait_for_imports()
+
+    data = client.get(f"/imports/{job_id}").json()
+    assert data["status"] == "failed"
+    assert "database is locked" in data["error"]
+
+
+def test_import_partial_failure_publishes_reset(client, monkeypatch):
+    """Test that games committed before a failure still reach live clients."""
+    steam_games = [
+        {"name": "Partial 1", "storeLink": "", "logo": ""},
+        {"name": "Partial 2", "storeLink": "", "logo": ""},
+        {"broken": "no name"},
+    ]
+    monkeypatch.setattr(jobs, "fetch_steam_games", lambda steamid: steam_games)
+    monkeypatch.setattr(jobs, "import_to_db", partial(jobs.import_to_db, batch_size=2))
+    monkeypatch.setattr(xml_to_json, "BATCH_PAUSE", 0)
+    last_seq = bus.last_seq
+
+    response = client.post("/imports", data={"steamid": "partial"})
+    job_id = response.json()["id"]
+    wait_for_imports()
+
+    data = client.get(f"/imports/{job_id}").json()
+    assert data["status"] == "failed"
+    assert data["imported"] == 2
+    assert bus.last_seq == last_seq + 1
+    assert bus.buffer[-1].event == "reset"
+
+
+def test_import_get_missing(client):
+    """Test getting an unknown import (GET /imports/{id})."""
+    response = client.get("/imports/999")
+    assert response.status_code == 404
+
+
+def test_games_publish_events(client):
+    """Test that write endpoints publish row changes to the event bus."""
+    data = {
+        "title": "Evented Game",
+        "start_date": "2023-01-01",
+        "end_date": "2023-12-31",
+        "rating": 3,
+    }
+    client.post("/games", data=data)
+    created = bus.buffer[-1]
+    assert created.event == "created"
+    assert "Evented Game" in created.data
+    game_id = client.get("/games", params={"title": "Evented"}).json()[0]["id"]
+    assert f'id="game-{game_id}"' in created.data
+
+    client.post(f"/games/{game_id}", data={**data, "title": "Evented Game - edit"})
+    updated = bus.buffer[-1]
+    assert updated.event == "updated"
+    assert "Evented Game - edit" in updated.data
+
+    client.post(f"/games/{game_id}/delete")
+    deleted = bus.buffer[-1]
+    assert deleted.event == "deleted"
+    assert deleted.data == str(game_id)
+    assert [e.id for e in bus.replay(created.id)] == [updated.id, deleted.id]
+
+
+def test_event_bus_replay():
+    """Test Last-Event-ID replay from the ring buffer."""
+    event_bus = EventBus(buffer_size=3)
+    assert event_bus.replay(None) == []
+    for i in range(5):
+        event_bus.publish("updated", f"<li>{i}</li>")
+    epoch = event_bus.epoch
+
+    assert event_bus.replay(f"{epoch}-5") == []
+    assert [e.seq for e in event_bus.replay(f"{epoch}-2")] == [3, 4, 5]
+    # Events older than the buffer, or unknown to this process, force a refetch
+    assert [e.event for e in event_bus.replay(f"{epoch}-1")] == ["reset"]
+    assert [e.event for e in event_bus.replay(f"{epoch}-9")] == ["reset"]
+    assert [e.event for e in event_bus.replay("garbage")] == ["reset"]
+    assert event_bus.replay(f"{epoch}-3")[0].encode() == (
+        f"id: {epoch}-4\nevent: updated\ndata: <li>3</li>\n\n"
+    )
+
+
+def test_event_bus_replay_after_restart():
+    """Test that ids from a previous process never replay a different history."""
+    old_bus = EventBus()
+    for i in range(57):
+        old_bus.publish("created", str(i))
+    new_bus = EventBus()
+    for i in range(60):
+        new_bus.publish("created", str(i))
+
+    replayed = new_bus.replay(old_bus.buffer[-1].id)
+    assert [e.event for e in replayed] == ["reset"]
+    assert replayed[0].id == f"{new_bus.epoch}-60"
+
+
+class StubRequest:
+    """Reports a disconnect once is_disconnected has been polled `polls` times."""
+
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+class RacingEventBus(EventBus):
+    """Publishes between subscribe and replay, like a concurrent write would."""
+
+    def subscribe(self):
+        queue = super().subscribe()
+        self.publish("created", "raced")
+        return queue
+
+
+def test_event_stream_replays_then_streams(monkeypatch):
+    """Test that replayed and queued events come out once each and in order."""
+    event_bus = RacingEventBus()
+    monkeypatch.setattr(events, "bus", event_bus)
+    monkeypatch.setattr(events, "KEEPALIVE_SECONDS", 0.01)
+    for i in range(3):
+        event_bus.publish("updated", str(i))
+
+    async def collect():
+        chunks = []
+        stream = events.event_stream(StubRequest(polls=3), f"{event_bus.epoch}-1")
+        async for chunk in stream:
+            chunks.append(chunk)
+            if len(chunks) == 2:
+                event_bus.publish("deleted", "7")
+        return chunks
+
+    chunks = asyncio.run(collect())
+    ids = [c.split("\n")[0] for c in chunks if c.startswith("id: ")]
+    assert ids == [f"id: {event_bus.epoch}-{seq}" for seq in (2, 3, 4, 5)]
+    assert "data: raced" in chunks[2]
+    assert "event: deleted" in chunks[3]
+    assert chunks[4:] == [": keepalive\n\n"] * len(chunks[4:])
+    assert not event_bus.subscribers
+
+
+def test_games_events_endpoint(client, monkeypatch):
+    """Test GET /games/events replays from the Last-Event-ID header."""
+
+    async def is_disconnected(self):
+        return True
+
+    monkeypatch.setattr(Request, "is_disconnected", is_disconnected)
+    first = bus.publish("updated", "<li>first</li>")
+    second = bus.publish("deleted", "42")
+
+    response = client.get("/games/events", headers={"Last-Event-ID": first.id})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/event-stream")
+    assert response.text == second.encode()
+
+    response = client.get("/games/events", headers={"Last-Event-ID": "stale-1"})
+    assert response.text == f"id: {second.id}\nevent: reset\ndata: \n\n"
+
+
+def test_games_events_since_list_load(client, monkeypatch):
+    """Test that a first connect replays writes made after the list was queried."""
+
+    async def is_disconnected(self):
+        return True
+
+    monkeypatch.setattr(Request, "is_disconnected", is_disconnected)
+    response = client.get("/games", headers={"HX-Request": "true"})
+    since = bus.last_event_id
+    assert f'data-last-event-id="{since}"' in response.text
+    missed = bus.publish("deleted", "43")
+
+    response = client.get("/games/events", params={"since": since})
+    assert response.text == missed.encode()
+
+    # A reconnect's Last-Event-ID header wins over the original since
+    response = client.get(
+        "/games/events", params={"since": since}, headers={"Last-Event-ID": missed.id}
+    )
+    assert response.text == ""
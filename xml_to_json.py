@@ -1,11 +1,21 @@
 import json
-from typing import List, Dict
+import time
+from typing import Callable, List, Dict, Optional
+from urllib.parse import quote
 
 import requests
 import xmltodict
 from sqlmodel import Session, create_engine, select
 
 from game import Game
+from util import logger
+
+DB_FILE = "sqlite:///games.db"
+# Rows written per transaction; the SQLite write lock is released between batches
+BATCH_SIZE = 50
+BATCH_PAUSE = 0.05
+# Seconds before a stalled Steam request gives up and fails the import
+STEAM_TIMEOUT = 30
 
 
 def xml_to_json(xml_file):
@@ -16,52 +26,79 @@ def xml_to_json(xml_file):
         return json_data
 
 
-def import_to_db(games: List[Dict]):
-    engine = create_engine("sqlite:///games.db")
+def fetch_steam_games(steamid: str) -> List[Dict]:
+    steam_url = (
+        f"https://steamcommunity.com/id/{quote(steamid, safe='')}/games/?tab=all&xml=1"
+    )
+    response = requests.get(steam_url, timeout=STEAM_TIMEOUT)
+    response.raise_for_status()  # Raise HTTPError for bad responses
+    data_dict = xmltodict.parse(response.text)
+    # Private, empty or unknown profiles come back without a games list
+    games_list = data_dict.get("gamesList") or {}
+    games = (games_list.get("games") or {}).get("game")
+    if not games:
+        raise ValueError(f"Steam profile {steamid} is private or has no games")
+    # xmltodict collapses a single <game> element into a dict
+    if isinstance(games, dict):
+        games = [games]
+    return games
+
+
+def import_to_db(
+    games: List[Dict],
+    engine=None,
+    batch_size: int = BATCH_SIZE,
+    on_batch: Optional[Callable[[Session, int, int], None]] = None,
+) -> int:
+    if engine is None:
+        engine = create_engine(DB_FILE)
     with Session(engine) as session:
-        statement = select(Game)
-        result = session.exec(statement)
-        existing_games = result.all()
+        existing_titles = set(session.exec(select(Game.title)).all())
 
-        for game_data in games:
-            # Map XML fields to your database model
-            new_game_name = game_data["name"]
-            if any(game.title == new_game_name for game in existing_games):
-                print(f"Game {new_game_name} already exists in database, skipping...")
-                continue
-            new_game = Game(
-                title=game_data["name"],
-                steam_store_url=game_data["storeLink"],
-                image_url=game_data["logo"],
-                start_date="",
-                end_date="",
-                completed=False,
-                gog_store_url="",
-                comments="",
-                tags="",
-                platforms=None,
-                genres=None,
-                developer="",
-                rating=0,
-            )
-            session.add(new_game)
-        session.commit()
-    print(f"Successfully imported {len(games)} games to database!")
+    imported = 0
+    for start in range(0, len(games), batch_size):
+        # One short transaction per batch so other writers can get in between
+        with Session(engine) as session:
+            for game_data in games[start : start + batch_size]:
+                # Map XML fields to your database model
+                new_game_name = game_data["name"]
+                if new_game_name in existing_titles:
+                    continue
+                new_game = Game(
+                    title=game_data["name"],
+                    steam_store_url=game_data["storeLink"],
+                    image_url=game_data["logo"],
+                    start_date="",
+                    end_date="",
+                    completed=False,
+                    gog_store_url="",
+                    comments="",
+                    tags="",
+                    platforms=None,
+                    genres=None,
+                    developer="",
+                    rating=0,
+                )
+                session.add(new_game)
+                existing_titles.add(new_game_name)
+                imported += 1
+            if on_batch:
+                on_batch(session, min(start + batch_size, len(games)), imported)
+            session.commit()
+        time.sleep(BATCH_PAUSE)
+    logger.info(
+        f"Imported {imported} of {len(games)} games, "
+        f"skipped {len(games) - imported} already in the database"
+    )
+    return imported
 
 
 if __name__ == "__main__":
     steamid = input("Enter your Steam ID: ")
-    steam_url = f"https://steamcommunity.com/id/{steamid}/games/?tab=all&xml=1"
-    xml_file = "games.xml"
     try:
-        response = requests.get(steam_url)
-        response.raise_for_status()  # Raise HTTPError for bad responses
-        with open(xml_file, "w", encoding="utf-8") as f:
-            f.write(response.text)
-
-    except requests.exceptions.RequestException as e:
+        games = fetch_steam_games(steamid)
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error downloading XML file: {e}")
         exit()  # Exit if the download fails
-    json_data = xml_to_json(xml_file)
-    json_data = json.loads(json_data)
-    import_to_db(json_data["gamesList"]["games"]["game"])
+    imported = import_to_db(games)
+    print(f"Successfully imported {imported} of {len(games)} games to database!")